@@ -1,6 +1,5 @@
 import streamlit as st
 from utils import *
-from openai import OpenAI
 from config import TRANSCRIPT_FILE
 
 # Set up the Streamlit page configuration
@@ -36,34 +35,44 @@ def generate_summary():
     - 🎯 Skills gap analysis
     """)
 
-    # Create two columns for resume upload and job description input
-    col1, col2 = st.columns(2)
-    with col1:
-        st.subheader("📄 Upload Resume")  # Section for uploading resume
-        resume_file = st.file_uploader("Choose resume file", type=["pdf", "txt"])  # File uploader
-        if resume_file:
-            st.success(f"✅ Uploaded: {resume_file.name}")  # Display success message
+    # Batch the inputs in a form so nothing reruns until the user submits
+    with st.form("summary_form"):
+        # Create two columns for resume upload and job description input
+        col1, col2 = st.columns(2)
+        with col1:
+            st.subheader("📄 Upload Resume")  # Section for uploading resume
+            resume_file = st.file_uploader("Choose resume file", type=["pdf", "txt"])  # File uploader
 
-    with col2:
-        st.subheader("📝 Job Description")  # Section for job description input
-        job_description = st.text_area("Paste job description here...", height=105)  # Text area for input
-        if job_description:
-            st.caption(f"Characters: {len(job_description)}")  # Display character count
+        with col2:
+            st.subheader("📝 Job Description")  # Section for job description input
+            job_description = st.text_area("Paste job description here...", height=105)  # Text area for input
 
-    st.markdown("---")  # Horizontal line
-    # Button to trigger summary generation
-    if st.button("🚀 Generate Summary", type="primary", use_container_width=True) and resume_file and job_description.strip():
+        st.markdown("---")  # Horizontal line
+        # Button to trigger summary generation
+        submitted = st.form_submit_button("🚀 Generate Summary", type="primary", use_container_width=True)
+
+    if submitted and resume_file and job_description.strip():
         status_text, progress_bar = show_progress("📤 Uploading files...", 20)  # Show progress bar
 
         try:
             # Prepare data for API request
             files = {"resume": (resume_file.name, resume_file.getvalue())}
             data = {"job_description": job_description}
-            status_text.text("🤖 AI is generating candidate summary...")
-            progress_bar.progress(60)
+
+            # Advance the progress bar from 20% to 60% as the resume is uploaded
+            def upload_progress(fraction):
+                progress_bar.progress(20 + int(40 * fraction))
+                if fraction >= 1:
+                    status_text.text("🤖 AI is generating candidate summary...")
+
+            # Parse the resume locally while the backend generates the summary
+            text_future = get_executor().submit(extract_text_from_file, resume_file)
 
             # Make API request to generate summary
-            result = make_api_request("/generate-summary", files=files, data=data, api_key=st.session_state.openai_api_key)
+            result = make_api_request("/generate-summary", files=files, data=data, api_key=st.session_state.openai_api_key,
+                                      on_progress=upload_progress)
+            # Prefer the backend's parsed resume; fall back to the local parse (cached either way)
+            resume_text = result.get("resume_text") or text_future.result()
 
             progress_bar.progress(100)
             status_text.empty()
@@ -76,7 +85,7 @@ def generate_summary():
 
             # Store data in session state for later use
             st.session_state.update({
-                'resume_text': extract_text_from_file(resume_file),
+                'resume_text': resume_text,
                 'job_description': job_description,
                 'summary': summary
             })
@@ -107,7 +116,6 @@ def generate_questions():
 
     # Button to trigger question generation
     if st.button("🚀 Generate Questions", type="primary"):
-        status_text, progress_bar = show_progress("🤖 AI is generating questions...", 50)  # Show progress bar
         try:
             # Prepare data for API request
             data = {
@@ -115,23 +123,86 @@ def generate_questions():
                 "job_description": st.session_state['job_description'],
                 "interview_type": interview_type
             }
-            # Make API request to generate questions
-            result = make_api_request("/generate-questions", data=data, api_key=st.session_state.openai_api_key)
+            # Wait for the JSON body, or the start of the event stream
+            with st.spinner("🤖 AI is generating questions..."):
+                response = stream_api_request("/generate-questions", data=data, api_key=st.session_state.openai_api_key)
 
-            progress_bar.progress(100)
-            status_text.empty()
-            progress_bar.empty()
-
-            # Display the generated questions
-            questions_raw = "\n".join(result.get("questions", []))
-            st.session_state["questions"] = questions_raw.split('\n')
             st.markdown(f"### ❓ Suggested {interview_type} Interview Questions")
-            display_structured_questions(questions_raw)
+            if isinstance(response, dict):
+                # Backend returned the question list as JSON: use it as-is
+                questions = response.get("questions", [])
+                display_structured_questions("\n".join(questions))
+            else:
+                # Stream the questions as they are generated, then swap in the structured list
+                placeholder = st.empty()
+                with placeholder.container():
+                    questions_raw = st.write_stream(response)
+                questions = [q for q in questions_raw.split('\n') if q.strip()]
+                with placeholder.container():
+                    display_structured_questions(questions_raw)
+            st.session_state["all_questions"] = questions
         except Exception as e:
-            progress_bar.empty()
-            status_text.empty()
             st.error(f"❌ Error: {str(e)}")  # Display error message
 
+# Fragment for the current question so answering only reruns this block
+@st.fragment
+def _render_question_flow(client, questions):
+    question = questions[st.session_state.current_q]
+    q_num = st.session_state.current_q + 1
+
+    # Synthesize this question and the next one in the background while the candidate answers
+    tts_futures = st.session_state.setdefault("tts_futures", {})
+    for upcoming in questions[st.session_state.current_q:st.session_state.current_q + 2]:
+        future = tts_futures.get(upcoming)
+        if future is None or future.cancelled() or (future.done() and future.exception()):
+            tts_futures[upcoming] = speak_tts_async(client, upcoming)
+
+    if st.button(f"▶ Start Question {q_num}", use_container_width=True):
+        tts_futures[question] = claim_tts(client, question, tts_futures[question])
+        st.audio(tts_futures[question].result(), format="audio/mp3")  # Ask the question with TTS
+
+    audio_input = st.audio_input("🎙 Your Answer")  # Capture user's answer
+
+    if audio_input and st.button("💬 Submit Answer", use_container_width=True):
+        answer_text = transcribe_audio(client, audio_input)  # Transcribe audio
+        st.session_state.transcripts.append({
+            "question": question,
+            "answer": answer_text
+        })
+        st.session_state.current_q += 1
+        # Rerun the whole page only once the interview is over
+        if st.session_state.current_q < st.session_state.num_questions:
+            st.rerun(scope="fragment")
+        else:
+            st.rerun()
+
+# Streams the evaluation into a shared list so the page can show partial output
+def _run_evaluation(prompt, llm, transcript_text, parts):
+    for chunk in stream_evaluation(prompt, llm, transcript_text):
+        parts.append(chunk)
+    return "".join(parts)
+
+# Shows the background evaluation result, or the text streamed so far while it runs
+def _render_evaluation(polling):
+    eval_future = st.session_state.eval_future
+    if not eval_future.done():
+        partial = "".join(st.session_state.eval_parts)
+        if partial:
+            st.markdown(partial)
+        else:
+            st.info("⏳ Evaluating candidate answers...")
+        return
+    if polling:
+        st.rerun()  # Rerun the page once so the fragment stops polling
+
+    try:
+        result = eval_future.result()
+    except Exception as e:
+        st.error(f"❌ Error: {str(e)}")  # Display error message
+        return
+    st.success("Evaluation Completed ✅")
+    st.markdown(result)
+
 # Function to conduct an AI-powered voice interview
 def ai_interview():
     st.title("🎤 AI Voice Interview")  # Page title
@@ -142,26 +213,27 @@ def ai_interview():
         return
 
     # Ensure questions are available
-    if "questions" not in st.session_state or not st.session_state["questions"]:
+    if not st.session_state.get("all_questions"):
         st.warning("⚠ Please generate interview questions first.")
         return
 
     # Let user select number of questions (default 5 or max available)
+    all_questions = st.session_state["all_questions"]
     num_questions = st.number_input(
         "📋 Number of Questions for Interview",
         min_value=1,
-        max_value=len(st.session_state["questions"]),
-        value=st.session_state.get("num_questions", min(5, len(st.session_state["questions"]))),
+        max_value=len(all_questions),
+        value=min(st.session_state.get("num_questions", 5), len(all_questions)),
         step=1
     )
 
     st.session_state.num_questions = num_questions
     st.info(f"✅ The interview will have {num_questions} questions.")
 
-    # Limit questions list dynamically
-    st.session_state.questions = st.session_state.questions[:num_questions]
+    # View of the questions used in this interview; the full list stays intact
+    active_questions = all_questions[:num_questions]
 
-    client = OpenAI(api_key=st.session_state.openai_api_key)  # Initialize OpenAI client
+    client = get_openai_client(st.session_state.openai_api_key)  # Reuse cached OpenAI client
 
     # Initialize progress tracking
     if "current_q" not in st.session_state:
@@ -171,44 +243,43 @@ def ai_interview():
 
     # Interview in progress
     if st.session_state.current_q < st.session_state.num_questions:
-        question = st.session_state["questions"][st.session_state.current_q]
-        q_num = st.session_state.current_q + 1 
-
-        if st.button(f"▶ Start Question {q_num}", use_container_width=True):
-            speak_tts(client, question)  # Ask the question with TTS
-
-        audio_input = st.audio_input("🎙 Your Answer")  # Capture user's answer
-
-        if audio_input and st.button("💬 Submit Answer", use_container_width=True):
-            answer_text = transcribe_audio(client, audio_input)  # Transcribe audio
-            st.session_state.transcripts.append({
-                "question": question,
-                "answer": answer_text
-            })
-            save_transcript_to_file(question, answer_text)  # Save to transcript file
-            st.session_state.current_q += 1
-            st.rerun()
+        _render_question_flow(client, active_questions)
 
     # Interview completed
     else:
         st.success("✅ Interview complete!")
 
-        if st.button("📊 Generate Results", use_container_width=True):
-            with st.spinner("Evaluating candidate answers..."):
-                chain = evaluate_answer(TRANSCRIPT_FILE, api_key=st.session_state.openai_api_key)
-
-                with open(TRANSCRIPT_FILE, "r", encoding="utf-8") as f:
-                    transcript_text = f.read().strip()
-
-                result = chain.run({"transcript": transcript_text})
+        transcript_text = format_transcript(st.session_state.transcripts)  # Build transcript from session state
 
-            st.success("Evaluation Completed ✅")
-            st.markdown(result)
+        if st.button("📊 Generate Results", use_container_width=True):
+            # Run the evaluation in the background so the page stays usable
+            prompt, llm = evaluate_answer(transcript_text, api_key=st.session_state.openai_api_key)
+            st.session_state.eval_parts = []
+            st.session_state.eval_future = get_executor().submit(
+                _run_evaluation, prompt, llm, transcript_text, st.session_state.eval_parts
+            )
+
+        # Poll twice a second while the evaluation is still streaming
+        eval_future = st.session_state.get("eval_future")
+        if eval_future is not None:
+            polling = not eval_future.done()
+            st.fragment(_render_evaluation, run_every=0.5 if polling else None)(polling)
+
+        # Optional export of the transcript
+        st.download_button(
+            "💾 Download Transcript",
+            data=transcript_text,
+            file_name=TRANSCRIPT_FILE,
+            mime="text/plain",
+            use_container_width=True
+        )
 
-            clear_transcript_file()
         if st.button("🔄 END Interview", use_container_width=True):
             st.session_state.current_q = 0
             st.session_state.transcripts = []
+            st.session_state.pop("eval_future", None)
+            st.session_state.pop("eval_parts", None)
+            st.session_state.pop("tts_futures", None)
             st.rerun()
 
 
@@ -1,4 +1,10 @@
+import os
+
 API_BASE_URL = "https://ai-interview-copilot-backend.onrender.com/"
 INTERVIEW_TYPES_FILE = "interview_types.txt"
 RESUME_TYPES = ["pdf", "txt"]
-TRANSCRIPT_FILE = "interview_transcript.txt"
\ No newline at end of file
+TRANSCRIPT_FILE = "interview_transcript.txt"
+# Opt-in SQLite cache for evaluation verdicts. The file stores candidate transcripts and
+# verdicts for every session and API key with no expiry; only enable it where that data
+# may be retained, and delete the file to purge it. Unset (the default) disables caching.
+LLM_CACHE_FILE = os.getenv("LLM_CACHE_FILE")
@@ -1,51 +1,176 @@
 import streamlit as st
 import requests
+from http.cookiejar import DefaultCookiePolicy
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from requests_toolbelt.multipart.encoder import MultipartEncoder, MultipartEncoderMonitor
 import re
-import fitz  # PyMuPDF for PDF text extraction
-from typing import Dict, Any
-from config import API_BASE_URL, INTERVIEW_TYPES_FILE, TRANSCRIPT_FILE
-import io
-from openai import OpenAI
-from langchain.chains import LLMChain
-from langchain_openai import ChatOpenAI
-from langchain.prompts import PromptTemplate
+import hashlib
+from typing import Dict, Any, Callable, Iterator, TYPE_CHECKING
+from config import API_BASE_URL, INTERVIEW_TYPES_FILE, LLM_CACHE_FILE
 import os
+import atexit
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Use orjson for decoding API responses when it is installed
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    import json
+    _json_loads = json.loads
+
+# Heavy SDKs (PyMuPDF, OpenAI, LangChain) are imported where they are used,
+# so pages that never touch them don't pay their import cost
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+# Precompiled pattern for stripping "1. " style numbering from questions
+_NUM_PREFIX_RE = re.compile(r'^\d+\.\s*')
+
+# Adapter that sends request bodies in 64 KB blocks instead of the 8-16 KB default
+class _LargeBlockAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["blocksize"] = 64 * 1024
+        super().init_poolmanager(*args, **kwargs)
+
+# Function to get a shared HTTP session so backend calls reuse keep-alive connections
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    """Return a pooled requests session for the backend API."""
+    session = requests.Session()
+    # The session is shared by every user, so never store or replay cookies
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    # Only connection errors are retried; every backend call is a POST, which is never replayed
+    retry = Retry(total=2, backoff_factor=0.2)
+    adapter = _LargeBlockAdapter(pool_connections=50, pool_maxsize=100, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    atexit.register(session.close)
+    return session
+
+# Function to extract a readable error message from a failed backend response
+def _error_message(response) -> str:
+    """Return the backend's 'detail' field, or the status code and body."""
+    try:
+        return _json_loads(response.content).get('detail', f'HTTP {response.status_code}')
+    except (ValueError, AttributeError):  # Body is not JSON, or not a JSON object
+        return f'HTTP {response.status_code}: {response.text}'
+
+# Function to turn request failures into the user-facing errors shown by the pages
+def _api_error(exc: Exception) -> Exception:
+    """Map a requests exception to an Exception with a readable message."""
+    if isinstance(exc, requests.exceptions.Timeout):
+        return Exception("Request timed out.")  # Handle timeout errors
+    if isinstance(exc, requests.exceptions.ConnectionError):
+        return Exception("Cannot connect to the backend server.")  # Handle connection errors
+    return Exception(str(exc))  # Handle other exceptions
 
 # Function to make API requests to the backend
-def make_api_request(endpoint: str, files: Dict = None, data: Dict = None, api_key: str = None) -> Dict[str, Any]:
-    """Generic API request handler."""
+def make_api_request(endpoint: str, files: Dict = None, data: Dict = None, api_key: str = None,
+                     on_progress: Callable[[float], None] = None) -> Dict[str, Any]:
+    """Generic API request handler. on_progress receives the uploaded fraction of a multipart body."""
     try:
         url = f"{API_BASE_URL}{endpoint}"  # Construct the full API URL
         headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
-        response = requests.post(url, files=files, data=data, headers=headers, timeout=60)
+        if files:
+            # Stream the multipart body instead of building it in memory, reporting bytes sent
+            encoder = MultipartEncoder(fields={**(data or {}), **files})
+            last_percent = -1
+
+            # Report progress only when the whole percentage changes, not on every block read
+            def callback(monitor):
+                nonlocal last_percent
+                percent = monitor.bytes_read * 100 // monitor.len
+                if on_progress and percent != last_percent:
+                    last_percent = percent
+                    on_progress(percent / 100)
+
+            monitor = MultipartEncoderMonitor(encoder, callback)
+            headers["Content-Type"] = monitor.content_type
+            response = get_http_session().post(url, data=monitor, headers=headers, timeout=(5, 60))
+        else:
+            response = get_http_session().post(url, data=data, headers=headers, timeout=(5, 60))
         if response.status_code == 200:
-            return response.json()  # Return JSON response if successful
+            return _json_loads(response.content)  # Return JSON response if successful
         else:
-            # Handle errors and extract error messages
-            try:
-                error_msg = response.json().get('detail', f'HTTP {response.status_code}')
-            except:
-                error_msg = f'HTTP {response.status_code}: {response.text}'
-            raise Exception(error_msg)
-    except requests.exceptions.Timeout:
-        raise Exception("Request timed out.")  # Handle timeout errors
-    except requests.exceptions.ConnectionError:
-        raise Exception("Cannot connect to the backend server.")  # Handle connection errors
+            raise Exception(_error_message(response))  # Handle errors and extract error messages
     except Exception as e:
-        raise Exception(str(e))  # Handle other exceptions
+        raise _api_error(e)
+
+# Function to request a server-sent event stream from the backend
+def stream_api_request(endpoint: str, data: Dict = None, api_key: str = None) -> Iterator[str] | Dict[str, Any]:
+    """Return an iterator of SSE text chunks, or the parsed JSON if the backend does not stream."""
+    try:
+        url = f"{API_BASE_URL}{endpoint}"  # Construct the full API URL
+        headers = {"Accept": "text/event-stream"}
+        if api_key:
+            headers["Authorization"] = f"Bearer {api_key}"
+        response = get_http_session().post(url, data=data, headers=headers, timeout=(5, 60), stream=True)
+        if response.status_code == 200 and response.headers.get("Content-Type", "").startswith("text/event-stream"):
+            return _iter_sse_events(response)
+
+        with response:
+            if response.status_code == 200:
+                return _json_loads(response.content)  # Backend answered without streaming
+            raise Exception(_error_message(response))  # Handle errors and extract error messages
+    except Exception as e:
+        raise _api_error(e)
+
+# Function to yield the data of each server-sent event in a streaming response
+def _iter_sse_events(response) -> Iterator[str]:
+    """Yield each event's data until the stream ends or sends [DONE]."""
+    try:
+        response.encoding = "utf-8"  # SSE is UTF-8 by spec; requests would assume ISO-8859-1
+        event_lines = []
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("data:"):
+                payload = line[5:]
+                event_lines.append(payload[1:] if payload.startswith(" ") else payload)
+            elif not line and event_lines:
+                # A blank line ends the current event
+                chunk = "\n".join(event_lines)
+                event_lines = []
+                if chunk == "[DONE]":
+                    return
+                yield chunk
+        if event_lines and event_lines != ["[DONE]"]:
+            yield "\n".join(event_lines)
+    except requests.exceptions.RequestException as e:
+        raise _api_error(e)
+    finally:
+        response.close()
+
+# Function to get a shared worker pool for work that should stay off the script thread
+@st.cache_resource
+def get_executor() -> ThreadPoolExecutor:
+    """Return a process-wide thread pool for background tasks."""
+    return ThreadPoolExecutor(max_workers=4)
 
 # Function to extract text from uploaded files (PDF or TXT)
 def extract_text_from_file(uploaded_file) -> str:
     """Extract text from PDF or TXT."""
+    pdf_bytes = uploaded_file.getvalue()
+    digest = hashlib.blake2b(pdf_bytes, digest_size=16).hexdigest()  # One fast pass over large uploads
+    return _extract_text_cached(digest, uploaded_file.type, pdf_bytes)
+
+# Cached worker so the same upload is only parsed once across reruns
+@st.cache_data(show_spinner=False, max_entries=32)
+def _extract_text_cached(digest: str, mime: str, _pdf_bytes: bytes) -> str:
+    """Extract text from raw file bytes, keyed on their digest and MIME type (the bytes are not hashed)."""
     try:
-        if uploaded_file.type == "application/pdf":
+        if mime == "application/pdf":
+            import fitz  # PyMuPDF for PDF text extraction
+
+            # Plain text only: expand ligatures and skip image blocks
+            flags = fitz.TEXTFLAGS_TEXT & ~fitz.TEXT_PRESERVE_LIGATURES & ~fitz.TEXT_PRESERVE_IMAGES
+
             # Extract text from PDF using PyMuPDF
-            pdf_bytes = uploaded_file.getvalue()
-            doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-            return "".join(page.get_text() for page in doc)  # Concatenate text from all pages
-        elif uploaded_file.type in ["text/plain", "application/octet-stream"]:
+            doc = fitz.open(stream=_pdf_bytes, filetype="pdf")
+            return "".join(page.get_text("text", flags=flags, sort=False) for page in doc)  # Concatenate text from all pages
+        elif mime in ["text/plain", "application/octet-stream"]:
             # Extract text from plain text files
-            return uploaded_file.getvalue().decode("utf-8")
+            return _pdf_bytes.decode("utf-8", errors="replace")
         return ""
     except Exception:
         return ""  # Return empty string if extraction fails
@@ -54,20 +179,30 @@ def extract_text_from_file(uploaded_file) -> str:
 def load_interview_types(file_path=INTERVIEW_TYPES_FILE):
     """Read interview types from a file."""
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            return [line.strip() for line in f if line.strip()]  
-    except FileNotFoundError:
+        mtime = os.path.getmtime(file_path)
+    except OSError:
         st.error(f"Interview type file not found: {file_path}")
         return []
+    return list(_read_interview_types(file_path, mtime))
+
+# Cached reader; the modification time in the key picks up edits to the file
+@st.cache_data(max_entries=8)
+def _read_interview_types(file_path: str, mtime: float) -> tuple:
+    """Parse interview types, one per non-empty line."""
+    with open(file_path, "r", encoding="utf-8") as f:
+        return tuple(line.strip() for line in f if line.strip())
 
 # Function to display AI-generated questions in a structured format
 def display_structured_questions(raw_text: str):
     """Display AI-generated questions without headings."""
-    lines = raw_text.strip().split('\n')  # Split text into lines
-    for q in lines:
-        q = re.sub(r'^\d+\.\s*', '', q.strip())  # Remove numbering if present
+    bullets = []
+    for line in raw_text.splitlines():
+        q = line.strip()
+        if q[:1].isdigit():
+            q = _NUM_PREFIX_RE.sub('', q)  # Remove numbering if present
         if q:
-            st.markdown(f"- {q}")  # Display each question as a bullet point
+            bullets.append(f"- {q}")
+    st.markdown("\n".join(bullets))  # Display all questions as one bullet list
 
 # Function to show a progress bar with a message
 def show_progress(message, progress):
@@ -77,65 +212,74 @@ def show_progress(message, progress):
     progress_bar = st.progress(progress)  # Display the progress bar
     return status_text, progress_bar
 
-# Function to use text-to-speech (TTS) to speak text
-def speak_tts(client, text):
-    """Speak text using GPT-4o-mini-TTS directly in memory."""
-    audio_buffer = io.BytesIO()  # Create an in-memory buffer for audio
-    with client.audio.speech.with_streaming_response.create(
+# Function to get a shared OpenAI client (reuses its connection pool across reruns)
+@st.cache_resource
+def get_openai_client(api_key: str) -> "OpenAI":
+    """Return a cached OpenAI client for the given API key."""
+    from openai import OpenAI
+
+    return OpenAI(api_key=api_key)
+
+# Function to synthesize text to MP3 bytes with GPT-4o-mini-TTS
+def synthesize_speech(client, text) -> bytes:
+    """Return the spoken text as MP3 bytes."""
+    response = client.audio.speech.create(
         model="gpt-4o-mini-tts",  # Specify the TTS model
         voice="coral",  # Specify the voice
         input=text,  # Input text to be spoken
         instructions="Speak in a professional and clear tone."  # Instructions for the voice
-    ) as response:
-        for chunk in response.iter_bytes():
-            audio_buffer.write(chunk)  # Write audio chunks to the buffer
+    )
+    return response.content
+
+# Function to use text-to-speech (TTS) to speak text
+def speak_tts(client, text):
+    """Speak text using GPT-4o-mini-TTS directly in memory."""
+    st.audio(synthesize_speech(client, text), format="audio/mp3")  # Hand the MP3 bytes straight to Streamlit
 
-    audio_buffer.seek(0)  # Reset the buffer pointer to the beginning
-    st.audio(audio_buffer, format="audio/mp3")  # Play the audio in Streamlit
+# Function to get a small pool reserved for TTS, so long evaluations never delay question audio
+@st.cache_resource
+def get_tts_executor() -> ThreadPoolExecutor:
+    """Return a process-wide thread pool for speech synthesis."""
+    return ThreadPoolExecutor(max_workers=2)
+
+# Function to start text-to-speech in the background
+def speak_tts_async(client, text) -> Future:
+    """Synthesize text on the TTS pool; pass .result() to st.audio when it is needed."""
+    return get_tts_executor().submit(synthesize_speech, client, text)
+
+# Function to avoid waiting on a prefetch that is still queued behind other sessions
+def claim_tts(client, text, future: Future) -> Future:
+    """Return a running or finished TTS future; a job that has not started is cancelled and synthesized inline."""
+    if future.cancel():
+        future = Future()
+        future.set_result(synthesize_speech(client, text))
+    return future
 
 # Function to transcribe audio to text using OpenAI's Whisper model
 def transcribe_audio(client, audio_file):
-    """Transcribe recorded audio to text."""
-    transcription = client.audio.transcriptions.create(
+    """Transcribe recorded audio to text. Accepts raw bytes, a file-like object or a path."""
+    if isinstance(audio_file, (str, os.PathLike)):
+        # Recordings on disk are streamed into the upload instead of loaded into memory
+        with open(audio_file, "rb") as fh:
+            return _create_transcription(client, fh)
+    return _create_transcription(client, audio_file)
+
+# Function to send audio bytes or a file handle to the Whisper API
+def _create_transcription(client, audio):
+    """Upload the audio as a WAV file and return the plain-text transcription."""
+    return client.audio.transcriptions.create(
         model="whisper-1",  # Specify the transcription model
-        file=audio_file  # Input audio file
+        file=("answer.wav", audio, "audio/wav"),  # Send the recorded WAV as-is
+        response_format="text"  # Plain text response, no JSON to parse
     )
-    return transcription.text  # Return the transcribed text
-
-# Function to save a question and answer pair to a transcript file
-def save_transcript_to_file(question, answer):
-    """Append question and answer to a text file."""
-    with open(TRANSCRIPT_FILE, "a", encoding="utf-8") as f:
-        f.write(f"Q: {question}\n")  # Write the question
-        f.write(f"A: {answer}\n\n")  # Write the answer
-
-# Function to clear the transcript file
-def clear_transcript_file():
-    """Clear the transcript file."""
-    with open(TRANSCRIPT_FILE, "w", encoding="utf-8") as f:
-        f.write("")  # Overwrite the file with an empty string
-        
-# Function to evaluate the answer 
-def evaluate_answer(file_path: str, api_key: str | None = None):
-    """
-    Creates an LLM chain for evaluating a candidate's answers from an interview transcript.
-    Returns the LLMChain object so you can call .run({"transcript": ...}) elsewhere.
-    """
-    # Read transcript
-    if not os.path.exists(file_path):
-        raise FileNotFoundError(f"Transcript file not found: {file_path}")
-    
-    with open(file_path, "r", encoding="utf-8") as f:
-        transcript_text = f.read().strip()
-    
-    if not transcript_text:
-        raise ValueError("Interview transcript is empty.")
-    
-    key = api_key or os.getenv("OPENAI_API_KEY")
-    if not key:
-        raise Exception("OPENAI_API_KEY not found. Provide it via env or pass api_key.")
-    
-    prompt_template = """
+
+# Function to build the transcript text from the Q/A pairs kept in session state
+def format_transcript(transcripts) -> str:
+    """Join question and answer pairs into a single transcript string."""
+    return "\n\n".join(f"Q: {t['question']}\nA: {t['answer']}" for t in transcripts)
+
+# Static evaluation rubric, kept byte-identical across calls so the provider can cache the prompt prefix
+EVALUATION_SYSTEM_PROMPT = """
 You are a highly experienced hiring manager and interview panel lead with deep expertise in candidate assessment.
 Your task is to evaluate the candidate's answers in the transcript and provide a structured, evidence-based verdict.
 
@@ -150,11 +294,6 @@ Your task is to evaluate the candidate's answers in the transcript and provide a
 
 ---
 
-### Interview Transcript:
-{transcript}
-
----
-
 ### Output Format:
 ## Candidate Answer Evaluation Report
 
@@ -175,7 +314,76 @@ Your task is to evaluate the candidate's answers in the transcript and provide a
 
 Be objective, evidence-based, and base all reasoning strictly on the transcript provided.
 """
-    prompt = PromptTemplate(input_variables=["transcript"], template=prompt_template)
-    llm = ChatOpenAI(temperature=0.2, model_name="gpt-4o-mini", openai_api_key=key)
-    chain = LLMChain(llm=llm, prompt=prompt, verbose=True)
-    return chain
+
+# Function to enable LangChain's response cache once per process
+@st.cache_resource
+def enable_llm_cache():
+    """Cache LLM responses on disk when LLM_CACHE_FILE is configured; otherwise do nothing."""
+    if not LLM_CACHE_FILE:
+        return
+
+    from langchain_core.globals import set_llm_cache
+    from langchain_community.cache import SQLiteCache
+
+    set_llm_cache(SQLiteCache(database_path=LLM_CACHE_FILE))
+
+# Model settings for the evaluation; also part of the response cache key
+EVALUATION_MODEL = "gpt-4o-mini"
+EVALUATION_TEMPERATURE = 0.2
+
+# Function to build the evaluation prompt and model once per API key (reuses the model's HTTP pool)
+@st.cache_resource
+def get_evaluation_model(api_key: str):
+    """Return a cached (prompt, ChatOpenAI) pair for the given API key."""
+    enable_llm_cache()  # Identical transcripts are answered from the cache, if enabled
+
+    from langchain_openai import ChatOpenAI
+    from langchain_core.prompts import ChatPromptTemplate
+
+    # Rubric first as the system message, only the transcript varies at the tail
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", EVALUATION_SYSTEM_PROMPT),
+        ("user", "### Interview Transcript:\n{transcript}")
+    ])
+    llm = ChatOpenAI(temperature=EVALUATION_TEMPERATURE, model_name=EVALUATION_MODEL, openai_api_key=api_key, streaming=True)
+    return prompt, llm
+
+# Function to evaluate the answer 
+def evaluate_answer(transcript_text: str, api_key: str | None = None):
+    """
+    Validates the transcript and returns the (prompt, model) pair for evaluating a candidate's answers.
+    Stream the verdict with stream_evaluation(prompt, llm, transcript_text) so the LLM cache is used.
+    """
+    if not transcript_text.strip():
+        raise ValueError("Interview transcript is empty.")
+    
+    key = api_key or os.getenv("OPENAI_API_KEY")
+    if not key:
+        raise Exception("OPENAI_API_KEY not found. Provide it via env or pass api_key.")
+    
+    return get_evaluation_model(key)
+
+# Function to stream an evaluation, replaying identical transcripts from the LLM cache
+def stream_evaluation(prompt, llm, transcript_text: str) -> Iterator[str]:
+    """Yield the verdict for a transcript. LangChain's stream() bypasses the LLM cache, so check and fill it here."""
+    from langchain_core.globals import get_llm_cache
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.outputs import Generation
+
+    inputs = {"transcript": transcript_text}
+    llm_cache = get_llm_cache()
+    # Keyed on the rendered prompt and the model settings, so rubric or model changes miss the cache
+    cache_prompt = prompt.format(**inputs)
+    llm_string = f"{EVALUATION_MODEL}|temperature={EVALUATION_TEMPERATURE}"
+
+    cached = llm_cache.lookup(cache_prompt, llm_string) if llm_cache else None
+    if cached:
+        yield "".join(generation.text for generation in cached)
+        return
+
+    parts = []
+    for chunk in (prompt | llm | StrOutputParser()).stream(inputs):
+        parts.append(chunk)
+        yield chunk
+    if llm_cache:
+        llm_cache.update(cache_prompt, llm_string, [Generation(text="".join(parts))])